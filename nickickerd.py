@@ -7,27 +7,117 @@ to monitor the health of its Internet connection and respond accordingly.
 """
 
 import os
+import re
 import sys
 import time
+import asyncio
 import signal
 import logging
+import logging.handlers
+import queue
 import yaml
 import subprocess
 import socket
+import struct
+import tarfile
+import threading
+import concurrent.futures
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 import argparse
+import functools
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+
+
+INTERVAL_RE = re.compile(r'^(\d+)\s*([smh]?)$')
+INTERVAL_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600}
+
+
+@functools.lru_cache(maxsize=16)
+def _parse_interval(interval_str: str) -> int:
+    """Parse time interval string (e.g., '30m', '2h') to seconds."""
+    match = INTERVAL_RE.match(interval_str.strip())
+    if match is None:
+        raise ValueError(f"Invalid time interval: {interval_str!r}")
+    return int(match.group(1)) * INTERVAL_UNITS[match.group(2)]
+
+
+def _address_family(address: str) -> int:
+    """Get the address family of a literal IP address."""
+    return socket.AF_INET6 if ':' in address else socket.AF_INET
+
+
+def _sd_notify(state: str) -> bool:
+    """Send a state notification (e.g. 'READY=1') to systemd, if supervised."""
+    address = os.environ.get('NOTIFY_SOCKET')
+    if not address:
+        return False
+    # Abstract namespace sockets are given with a leading '@'
+    if address.startswith('@'):
+        address = '\0' + address[1:]
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.connect(address)
+            sock.sendall(state.encode())
+    except OSError:
+        return False
+    return True
+
+
+def _icmp_checksum(data: bytes) -> int:
+    """Compute the Internet checksum (RFC 1071) of an ICMP message."""
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
 
 
 class NickickerDaemon:
     """Main daemon class for network connectivity monitoring."""
     
+    # Consider connection healthy if at least 40% of endpoints are reachable
+    HEALTHY_FRACTION = 0.4
+    
     def __init__(self, config_path: str = "/etc/nickicker.conf"):
         self.config_path = config_path
         self.config = {}
+        self._config_mtime = None
+        self._unique_ips: Dict[str, List[int]] = {}
+        self._address_families: Dict[str, int] = {}
         self.running = False
+        self._stop = threading.Event()
         self.logger = self._setup_logging()
         
+        # ICMP echo sockets and state, shared by all probes
+        self._icmp4 = None
+        self._icmp6 = None
+        self._icmp_available = self._open_icmp_sockets()
+        self._icmp_waiters: Dict[tuple, asyncio.Future] = {}
+        self._icmp_seq = 0
+        self._icmp_loop = None
+        
+        # Resolved endpoint names, keyed by hostname: (expiry time, addresses)
+        self._dns_cache: Dict[str, tuple] = {}
+        
+        # Lookups run on their own executor so a slow resolver never holds up
+        # the event loop's shutdown at the end of a cycle
+        self._dns_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix='nickickerd-dns'
+        )
+        self._dns_pending: Dict[str, concurrent.futures.Future] = {}
+        
         # Load configuration
         self._load_config()
         
@@ -36,7 +126,10 @@ class NickickerDaemon:
         signal.signal(signal.SIGINT, self._signal_handler)
     
     def _setup_logging(self) -> logging.Logger:
-        """Setup logging configuration."""
+        """
+        Setup logging configuration. Records are queued and written out by a
+        background listener so the probe loop never waits on log I/O.
+        """
         logger = logging.getLogger('nickickerd')
         logger.setLevel(logging.INFO)
         
@@ -45,9 +138,11 @@ class NickickerDaemon:
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
         
-        # Create file handler
+        # Create file handler, rotated so log bundles stay a sensible size
         log_file = "/var/log/nickickerd.log"
-        file_handler = logging.FileHandler(log_file)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=10_000_000, backupCount=3
+        )
         file_handler.setLevel(logging.INFO)
         file_handler.setFormatter(formatter)
         
@@ -56,25 +151,52 @@ class NickickerDaemon:
         console_handler.setLevel(logging.INFO)
         console_handler.setFormatter(formatter)
         
-        # Add handlers
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+        # Add queue handler and start the listener that writes out records
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        self._log_listener = logging.handlers.QueueListener(
+            log_queue, file_handler, console_handler, respect_handler_level=True
+        )
+        self._log_listener.start()
         
         return logger
     
     def _load_config(self):
         """Load configuration from YAML file."""
         try:
-            if os.path.exists(self.config_path):
+            try:
+                mtime = os.stat(self.config_path).st_mtime
+            except FileNotFoundError:
+                mtime = None
+            
+            if mtime is not None:
+                # Skip re-parsing if the file hasn't changed since last load
+                if mtime == self._config_mtime and self.config:
+                    return
                 with open(self.config_path, 'r') as f:
-                    self.config = yaml.safe_load(f)
+                    self.config = yaml.load(f, Loader=SafeLoader)
+                self._config_mtime = mtime
                 self.logger.info(f"Configuration loaded from {self.config_path}")
             else:
                 self.logger.warning(f"Configuration file {self.config_path} not found, using defaults")
                 self.config = self._get_default_config()
+                self._config_mtime = None
         except Exception as e:
             self.logger.error(f"Error loading configuration: {e}")
             self.config = self._get_default_config()
+            self._config_mtime = None
+        
+        self._unique_ips = self._index_addresses(self.config.get('endpoints', []))
+        self._address_families = {address: _address_family(address) for address in self._unique_ips}
+    
+    @staticmethod
+    def _index_addresses(endpoints: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+        """Map each distinct address to the indexes of the endpoints listing it."""
+        unique_ips: Dict[str, List[int]] = {}
+        for index, endpoint in enumerate(endpoints):
+            for address in dict.fromkeys(endpoint.get('addresses', [])):
+                unique_ips.setdefault(address, []).append(index)
+        return unique_ips
     
     def _get_default_config(self) -> Dict[str, Any]:
         """Get default configuration if config file is not available."""
@@ -96,37 +218,303 @@ class NickickerDaemon:
     
     def _parse_time_interval(self, interval_str: str) -> int:
         """Parse time interval string (e.g., '30m', '2h') to seconds."""
-        if interval_str.endswith('m'):
-            return int(interval_str[:-1]) * 60
-        elif interval_str.endswith('h'):
-            return int(interval_str[:-1]) * 3600
-        elif interval_str.endswith('s'):
-            return int(interval_str[:-1])
+        # YAML hands us a plain int when no unit is given
+        return _parse_interval(str(interval_str))
+    
+    def _open_icmp_sockets(self) -> bool:
+        """
+        Open the unprivileged ICMP sockets used for all probes. Returns False
+        if the kernel does not permit them, in which case ping is used instead.
+        """
+        sockets = []
+        try:
+            for family, proto in ((socket.AF_INET, socket.IPPROTO_ICMP),
+                                  (socket.AF_INET6, socket.IPPROTO_ICMPV6)):
+                try:
+                    sock = socket.socket(family, socket.SOCK_DGRAM, proto)
+                except PermissionError:
+                    raise
+                except OSError:
+                    # e.g. no IPv6 support; probes for this family will fail
+                    sockets.append(None)
+                    continue
+                sock.setblocking(False)
+                sockets.append(sock)
+        except PermissionError:
+            # Not permitted by net.ipv4.ping_group_range
+            for sock in sockets:
+                if sock is not None:
+                    sock.close()
+            self.logger.info("ICMP sockets not permitted, falling back to ping")
+            return False
+        
+        if not any(sockets):
+            self.logger.info("ICMP sockets unavailable, falling back to ping")
+            return False
+        
+        self._icmp4, self._icmp6 = sockets
+        return True
+    
+    @staticmethod
+    def _next_test_interval(current: int, healthy: bool, floor: int, ceiling: int) -> int:
+        """
+        Get the interval until the next test: double it after a healthy test,
+        up to ceiling, and drop back to floor after a failed one.
+        """
+        if not healthy:
+            return floor
+        return min(max(current, floor) * 2, ceiling)
+    
+    def _icmp_read(self, sock: socket.socket, family: int):
+        """Drain pending ICMP replies and wake up the matching probes."""
+        reply_type = ICMP_ECHO_REPLY if family == socket.AF_INET else ICMPV6_ECHO_REPLY
+        while True:
+            try:
+                packet = sock.recv(1024)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # Errors such as ICMP unreachable are reported on the socket;
+                # the affected probe will simply time out
+                continue
+            
+            if len(packet) < 8:
+                continue
+            icmp_type, _, _, _, seq = struct.unpack('!BBHHH', packet[:8])
+            if icmp_type != reply_type:
+                continue
+            
+            waiter = self._icmp_waiters.get((family, seq))
+            if waiter is not None and not waiter.done():
+                waiter.set_result(True)
+    
+    def _icmp_watch(self, loop: asyncio.AbstractEventLoop):
+        """
+        Register the ICMP sockets with the event loop's selector (epoll on
+        Linux), so replies to every outstanding probe are collected by a
+        single poll. Sockets stay registered until _icmp_unwatch() rather
+        than being added and removed around each probe.
+        """
+        if self._icmp_loop is loop:
+            return
+        for family, sock in ((socket.AF_INET, self._icmp4), (socket.AF_INET6, self._icmp6)):
+            if sock is not None:
+                loop.add_reader(sock.fileno(), self._icmp_read, sock, family)
+        self._icmp_loop = loop
+    
+    def _icmp_unwatch(self):
+        """Unregister the ICMP sockets from the event loop."""
+        if self._icmp_loop is None:
+            return
+        for sock in (self._icmp4, self._icmp6):
+            if sock is not None:
+                self._icmp_loop.remove_reader(sock.fileno())
+        self._icmp_loop = None
+    
+    async def _icmp_ping(self, address: str, family: Optional[int] = None,
+                         timeout: float = 2.0) -> bool:
+        """Send a single ICMP echo request and wait for its reply."""
+        if family is None:
+            family = _address_family(address)
+        sock = self._icmp6 if family == socket.AF_INET6 else self._icmp4
+        if sock is None:
+            return False
+        
+        # The kernel replaces the identifier with the socket's own, so
+        # replies are correlated by sequence number only
+        self._icmp_seq = (self._icmp_seq + 1) & 0xffff
+        seq = self._icmp_seq
+        ident = os.getpid() & 0xffff
+        if family == socket.AF_INET:
+            header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+            header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, _icmp_checksum(header), ident, seq)
         else:
-            return int(interval_str)
+            # The kernel fills in the ICMPv6 checksum
+            header = struct.pack('!BBHHH', ICMPV6_ECHO_REQUEST, 0, 0, ident, seq)
+        
+        loop = asyncio.get_running_loop()
+        self._icmp_watch(loop)
+        waiter = loop.create_future()
+        self._icmp_waiters[(family, seq)] = waiter
+        try:
+            sock.sendto(header, (address, 0))
+            return await asyncio.wait_for(waiter, timeout=timeout)
+        except (asyncio.TimeoutError, OSError):
+            return False
+        finally:
+            del self._icmp_waiters[(family, seq)]
     
-    def _test_connectivity(self, endpoint: Dict[str, Any]) -> bool:
-        """Test connectivity to a specific endpoint."""
+    async def _subprocess_ping(self, address: str) -> bool:
+        """Ping an address using the system ping binary."""
+        # posix_spawn uses vfork on Linux, so the daemon's page tables are
+        # not copied just to exec ping
+        try:
+            pid = os.posix_spawnp(
+                'ping', ['ping', '-c', '1', '-W', '5', address], os.environ,
+                file_actions=[
+                    (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0),
+                    (os.POSIX_SPAWN_OPEN, 2, os.devnull, os.O_WRONLY, 0)
+                ]
+            )
+        except FileNotFoundError:
+            return False
+        
+        # Wait for ping to exit without reaping it, so its pid cannot be
+        # reused before we are done signalling it
+        loop = asyncio.get_running_loop()
+        waiter = loop.run_in_executor(None, os.waitid, os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=10)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            # Don't leave ping running if we timed out or were cancelled
+            if not waiter.done():
+                os.kill(pid, signal.SIGKILL)
+                await waiter
+            _, status = os.waitpid(pid, 0)
+        
+        return os.waitstatus_to_exitcode(status) == 0
+    
+    async def _ping(self, address: str, family: Optional[int] = None) -> bool:
+        """Ping an address, preferring unprivileged ICMP sockets."""
+        if self._icmp_available:
+            return await self._icmp_ping(address, family)
+        return await self._subprocess_ping(address)
+    
+    async def _resolve(self, name: str, ttl: float = 300, error_ttl: float = 0.15) -> List[str]:
+        """Resolve a hostname to its addresses, caching the result."""
+        cached = self._dns_cache.get(name)
+        if cached is not None and time.time() < cached[0]:
+            return cached[1]
+        
+        # Share a lookup still in flight from an earlier, cancelled cycle
+        future = self._dns_pending.get(name)
+        if future is None:
+            future = self._dns_executor.submit(
+                socket.getaddrinfo, name, None, type=socket.SOCK_DGRAM
+            )
+            self._dns_pending[name] = future
+            # Cache from the worker thread so a late answer is kept even if
+            # the probe waiting on it has been cancelled
+            future.add_done_callback(functools.partial(self._cache_resolved, name, ttl, error_ttl))
+        
+        # Answer from the lookup itself; the caching callback may not have
+        # run yet when a shared lookup has only just finished
+        try:
+            infos = await asyncio.wrap_future(future)
+        except (OSError, UnicodeError):
+            return []
+        
+        return list(dict.fromkeys(info[4][0] for info in infos))
+    
+    def _cache_resolved(self, name: str, ttl: float, error_ttl: float,
+                        future: concurrent.futures.Future):
+        """Store the result of a finished lookup in the DNS cache."""
+        self._dns_pending.pop(name, None)
+        if not future.cancelled() and future.exception() is None:
+            addresses = list(dict.fromkeys(info[4][0] for info in future.result()))
+            self._dns_cache[name] = (time.time() + ttl, addresses)
+        else:
+            # Only briefly remember failures so a flaky resolver recovers quickly
+            self._dns_cache[name] = (time.time() + error_ttl, [])
+    
+    async def _test_resolved(self, endpoint: Dict[str, Any]) -> bool:
+        """
+        Test connectivity to the resolved addresses of an endpoint's name.
+        Used once the configured addresses have failed, so a healthy cycle
+        never touches DNS.
+        """
         name = endpoint.get('name', 'unknown')
         addresses = endpoint.get('addresses', [])
         
-        for address in addresses:
+        if 'name' in endpoint:
+            resolved = [address for address in await self._resolve(name) if address not in addresses]
+            pending = {asyncio.create_task(self._ping(address)): address for address in resolved}
             try:
-                # Try to ping the address
-                result = subprocess.run(
-                    ['ping', '-c', '1', '-W', '5', address],
-                    capture_output=True,
-                    timeout=10
-                )
-                if result.returncode == 0:
-                    self.logger.debug(f"Successfully pinged {name} ({address})")
-                    return True
-            except (subprocess.TimeoutExpired, FileNotFoundError):
-                continue
+                while pending:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        address = pending.pop(task)
+                        if task.result():
+                            self.logger.debug("Successfully pinged %s (%s)", name, address)
+                            return True
+            finally:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
         
-        self.logger.warning(f"Failed to ping {name} ({addresses})")
+        self.logger.warning("Failed to ping %s (%s)", name, addresses)
         return False
     
+    async def _test_connectivity(self, endpoint: Dict[str, Any]) -> bool:
+        """Test connectivity to a specific endpoint."""
+        successful, _ = await self._test_endpoints([endpoint], self._index_addresses([endpoint]))
+        return successful == 1
+    
+    async def _test_endpoints(self, endpoints: List[Dict[str, Any]],
+                              unique_ips: Dict[str, List[int]]) -> Tuple[int, int]:
+        """
+        Test connectivity to several endpoints concurrently, stopping as soon
+        as the outcome is decided. Each address in unique_ips is pinged once,
+        however many endpoints list it, and an endpoint is reachable if any
+        of its addresses respond. Returns the number of reachable endpoints
+        and the number of endpoints whose test completed.
+        """
+        total = len(endpoints)
+        results: List[Optional[bool]] = [None] * total
+        untested = [len(set(endpoint.get('addresses', []))) for endpoint in endpoints]
+        
+        # Families of configured addresses are classified once at load time
+        probes = {
+            asyncio.create_task(self._ping(address, self._address_families.get(address))): address
+            for address in unique_ips
+        }
+        fallbacks = {
+            asyncio.create_task(self._test_resolved(endpoint)): index
+            for index, endpoint in enumerate(endpoints) if not untested[index]
+        }
+        try:
+            while probes or fallbacks:
+                done, _ = await asyncio.wait(
+                    set(probes) | set(fallbacks), return_when=asyncio.FIRST_COMPLETED
+                )
+                
+                for task in done:
+                    if task in fallbacks:
+                        results[fallbacks.pop(task)] = task.result()
+                        continue
+                    
+                    address = probes.pop(task)
+                    for index in unique_ips[address]:
+                        if results[index] is not None:
+                            continue
+                        if task.result():
+                            self.logger.debug("Successfully pinged %s (%s)",
+                                              endpoints[index].get('name', 'unknown'), address)
+                            results[index] = True
+                        else:
+                            untested[index] -= 1
+                            if not untested[index]:
+                                fallback = asyncio.create_task(self._test_resolved(endpoints[index]))
+                                fallbacks[fallback] = index
+                
+                # The remaining tests can no longer change the verdict
+                successful = results.count(True)
+                failed = results.count(False)
+                if (successful / total >= self.HEALTHY_FRACTION or
+                        (total - failed) / total < self.HEALTHY_FRACTION):
+                    break
+        finally:
+            pending = set(probes) | set(fallbacks)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            self._icmp_unwatch()
+        
+        successful = results.count(True)
+        return successful, successful + results.count(False)
+    
     def _test_all_endpoints(self) -> bool:
         """Test connectivity to all configured endpoints."""
         endpoints = self.config.get('endpoints', [])
@@ -134,18 +522,20 @@ class NickickerDaemon:
             self.logger.warning("No endpoints configured")
             return False
         
-        successful_tests = 0
+        # Probe all endpoints concurrently so a cycle takes only as long as
+        # the fastest endpoints needed to reach a verdict
+        successful_tests, completed_tests = asyncio.run(
+            self._test_endpoints(endpoints, self._unique_ips)
+        )
         total_tests = len(endpoints)
         
-        for endpoint in endpoints:
-            if self._test_connectivity(endpoint):
-                successful_tests += 1
-        
         success_rate = successful_tests / total_tests
-        self.logger.info(f"Connectivity test: {successful_tests}/{total_tests} endpoints reachable")
+        self.logger.info(
+            "Connectivity test: %d/%d endpoints reachable (%d tested)",
+            successful_tests, total_tests, completed_tests
+        )
         
-        # Consider connection healthy if at least 40% of endpoints are reachable
-        return success_rate >= 0.4
+        return success_rate >= self.HEALTHY_FRACTION
     
     def _execute_actions(self, actions: List[str]):
         """Execute configured actions when connectivity issues are detected."""
@@ -169,21 +559,20 @@ class NickickerDaemon:
             timestamp = time.strftime("%Y%m%d_%H%M%S")
             bundle_path = f"/tmp/nickicker_logs_{timestamp}.tar.gz"
             
-            # Collect relevant logs and system information
-            log_files = [
-                "/var/log/nickickerd.log",
-                "/var/log/messages",
-                "/var/log/syslog"
-            ]
-            
-            # Create tar.gz bundle
-            cmd = ['tar', '-czf', bundle_path]
-            for log_file in log_files:
-                if os.path.exists(log_file):
-                    cmd.append(log_file)
+            # Collect relevant logs and system information, scanning the log
+            # directory once rather than checking each file separately
+            log_dir = "/var/log"
+            log_names = ["nickickerd.log", "messages", "syslog"]
+            with os.scandir(log_dir) as entries:
+                present = {entry.name for entry in entries if entry.is_file()}
+            log_files = [os.path.join(log_dir, name) for name in log_names if name in present]
             
-            if len(cmd) > 3:  # More than just tar command
-                subprocess.run(cmd, check=True)
+            if log_files:
+                # Create tar.gz bundle in-process; fast compression keeps the
+                # CPU cost low while the network is already in trouble
+                with tarfile.open(bundle_path, 'w:gz', compresslevel=1) as tar:
+                    for log_file in log_files:
+                        tar.add(log_file, arcname=os.path.basename(log_file))
                 self.logger.info(f"Log bundle created: {bundle_path}")
             else:
                 self.logger.warning("No log files found to bundle")
@@ -200,61 +589,101 @@ class NickickerDaemon:
         """Handle shutdown signals."""
         self.logger.info(f"Received signal {signum}, shutting down...")
         self.running = False
+        self._stop.set()
     
     def run(self):
         """Main daemon loop."""
-        self.logger.info("nickickerd starting up...")
-        self.running = True
-        
-        # Parse intervals
-        test_interval = self._parse_time_interval(self.config.get('test_interval', '30m'))
-        outage_threshold = self._parse_time_interval(self.config.get('outage_threshold', '2h'))
-        
-        last_test_time = time.time()
-        consecutive_failures = 0
-        last_success_time = time.time()
-        
-        while self.running:
-            try:
-                current_time = time.time()
-                
-                # Check if it's time to test connectivity
-                if current_time - last_test_time >= test_interval:
-                    self.logger.debug("Running connectivity test...")
+        try:
+            self.logger.info("nickickerd starting up...")
+            self.running = True
+            
+            # Parse intervals
+            test_interval = self._parse_time_interval(self.config.get('test_interval', '30m'))
+            outage_threshold = self._parse_time_interval(self.config.get('outage_threshold', '2h'))
+            test_interval_floor = self._parse_time_interval(self.config.get('test_interval_floor', '5s'))
+            
+            # A zero interval would never back off and test in a tight loop
+            if test_interval < 1 or test_interval_floor < 1:
+                self.logger.warning("Test intervals must be at least 1s, using 1s")
+            test_interval = max(1, test_interval)
+            test_interval_floor = max(1, min(test_interval_floor, test_interval))
+            
+            # Test interval backs off towards test_interval while the connection
+            # is healthy and drops to the floor as soon as a test fails
+            self._cur_interval = test_interval_floor
+            
+            last_test_time = time.time()
+            consecutive_failures = 0
+            last_success_time = time.time()
+            last_action_time = 0.0
+            
+            # Tell systemd we are up; sent at startup rather than after the first
+            # healthy test so a host booting without connectivity still starts
+            _sd_notify("READY=1")
+            
+            while self.running:
+                try:
+                    current_time = time.time()
                     
-                    if self._test_all_endpoints():
-                        # Connection is healthy
-                        consecutive_failures = 0
-                        last_success_time = current_time
-                        self.logger.info("Network connectivity is healthy")
-                    else:
-                        # Connection issues detected
-                        consecutive_failures += 1
-                        outage_duration = current_time - last_success_time
+                    # Check if it's time to test connectivity
+                    if current_time - last_test_time >= self._cur_interval:
+                        self.logger.debug("Running connectivity test...")
                         
-                        self.logger.warning(
-                            f"Connectivity issues detected. "
-                            f"Consecutive failures: {consecutive_failures}, "
-                            f"Outage duration: {outage_duration:.0f}s"
-                        )
+                        if self._test_all_endpoints():
+                            # Connection is healthy
+                            consecutive_failures = 0
+                            last_success_time = current_time
+                            self._cur_interval = self._next_test_interval(
+                                self._cur_interval, True, test_interval_floor, test_interval
+                            )
+                            self.logger.info("Network connectivity is healthy")
+                        else:
+                            # Connection issues detected
+                            consecutive_failures += 1
+                            self._cur_interval = self._next_test_interval(
+                                self._cur_interval, False, test_interval_floor, test_interval
+                            )
+                            outage_duration = current_time - last_success_time
+                            
+                            self.logger.warning(
+                                "Connectivity issues detected. "
+                                "Consecutive failures: %d, "
+                                "Outage duration: %.0fs",
+                                consecutive_failures, outage_duration
+                            )
+                            
+                            # Check if we should execute actions, at most once
+                            # per test_interval even while retesting more often
+                            if (outage_duration >= outage_threshold and
+                                    current_time - last_action_time >= test_interval):
+                                actions = self.config.get('actions', [])
+                                if actions:
+                                    self.logger.warning("Executing actions: %s", actions)
+                                    self._execute_actions(actions)
+                                    last_action_time = current_time
                         
-                        # Check if we should execute actions
-                        if outage_duration >= outage_threshold:
-                            actions = self.config.get('actions', [])
-                            if actions:
-                                self.logger.warning(f"Executing actions: {actions}")
-                                self._execute_actions(actions)
+                        last_test_time = current_time
                     
-                    last_test_time = current_time
-                
-                # Sleep for a short interval
-                time.sleep(10)
-                
-            except Exception as e:
-                self.logger.error(f"Error in main loop: {e}")
-                time.sleep(5)
-        
-        self.logger.info("nickickerd shutting down...")
+                    # Sleep until the next test is due, waking early on shutdown
+                    sleep_for = max(0, self._cur_interval - (time.time() - last_test_time))
+                    if self._stop.wait(sleep_for):
+                        break
+                    
+                except Exception as e:
+                    self.logger.error("Error in main loop: %s", e)
+                    if self._stop.wait(5):
+                        break
+            
+            self.logger.info("nickickerd shutting down...")
+        except Exception:
+            self.logger.exception("nickickerd stopped by an unexpected error")
+            raise
+        finally:
+            _sd_notify("STOPPING=1")
+            self._dns_executor.shutdown(wait=False, cancel_futures=True)
+            # Flush queued records so the log shows why we stopped, even if
+            # startup failed
+            self._log_listener.stop()
 
 
 def main():
@@ -276,10 +705,14 @@ def main():
     # Create and run daemon
     daemon = NickickerDaemon(args.config)
     
-    if args.foreground:
+    # systemd supervises us directly when started as Type=notify, so there
+    # is no need to fork or write a PID file
+    if args.foreground or os.environ.get('NOTIFY_SOCKET'):
         daemon.run()
     else:
-        # Daemonize
+        # Daemonize; the log listener thread would not survive the forks, so
+        # flush and stop it here and restart it in the daemon process
+        daemon._log_listener.stop()
         try:
             pid = os.fork()
             if pid > 0:
@@ -300,6 +733,8 @@ def main():
             with open('/var/run/nickickerd.pid', 'w') as f:
                 f.write(str(os.getpid()))
             
+            daemon._log_listener.start()
+            
             # Run daemon
             daemon.run()
             
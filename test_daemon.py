@@ -6,6 +6,9 @@ This script tests the core functionality without running as a daemon.
 
 import sys
 import os
+import asyncio
+import socket
+import struct
 import tempfile
 import yaml
 from pathlib import Path
@@ -13,7 +16,7 @@ from pathlib import Path
 # Add the current directory to Python path to import nickickerd
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from nickickerd import NickickerDaemon
+from nickickerd import NickickerDaemon, _icmp_checksum
 
 
 def create_test_config():
@@ -42,6 +45,16 @@ def create_test_config():
     return config_path
 
 
+def make_fake_ping(outcomes, calls):
+    """Create a stand-in for _ping that answers after a delay without network."""
+    async def fake_ping(address, family=None):
+        calls[address] = calls.get(address, 0) + 1
+        delay, result = outcomes[address]
+        await asyncio.sleep(delay)
+        return result
+    return fake_ping
+
+
 def test_daemon_basic():
     """Test basic daemon functionality."""
     print("Testing basic daemon functionality...")
@@ -61,13 +74,103 @@ def test_daemon_basic():
         # Test time parsing
         test_interval = daemon._parse_time_interval('30m')
         assert test_interval == 1800, f"Expected 1800, got {test_interval}"
+        assert daemon._parse_time_interval('45s') == 45
+        assert daemon._parse_time_interval('2h') == 7200
+        assert daemon._parse_time_interval(90) == 90
+        try:
+            daemon._parse_time_interval('30min')
+            assert False, "Expected ValueError for '30min'"
+        except ValueError:
+            pass
         print("✓ Time interval parsing works correctly")
         
+        # Test adaptive test interval backoff
+        assert daemon._next_test_interval(5, True, 5, 1800) == 10
+        assert daemon._next_test_interval(1280, True, 5, 1800) == 1800
+        assert daemon._next_test_interval(1800, True, 5, 1800) == 1800
+        assert daemon._next_test_interval(1800, False, 5, 1800) == 5
+        assert daemon._next_test_interval(0, True, 1, 1) == 1
+        print("✓ Test interval backoff works correctly")
+        
         # Test endpoint structure
         endpoints = daemon.config.get('endpoints', [])
         assert len(endpoints) == 2, f"Expected 2 endpoints, got {len(endpoints)}"
         print("✓ Endpoint configuration structure is correct")
         
+        # Test ICMP checksum against a known echo request header
+        checksum = _icmp_checksum(struct.pack('!BBHHH', 8, 0, 0, 1, 1))
+        assert checksum == 0xf7fd, f"Expected 0xf7fd, got {checksum:#06x}"
+        print("✓ ICMP checksum is correct")
+        
+        # Test that only echo replies with a matching sequence wake a probe
+        loop = asyncio.new_event_loop()
+        sender, receiver = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            receiver.setblocking(False)
+            waiters = {seq: loop.create_future() for seq in (1, 2, 3)}
+            for seq, waiter in waiters.items():
+                daemon._icmp_waiters[(socket.AF_INET, seq)] = waiter
+            sender.send(struct.pack('!BBHHH', 8, 0, 0, 0, 1))   # echo request, not a reply
+            sender.send(struct.pack('!BBH', 0, 0, 0))            # truncated reply for seq 2
+            sender.send(struct.pack('!BBHHH', 0, 0, 0, 0, 3))   # valid reply
+            daemon._icmp_read(receiver, socket.AF_INET)
+            assert not waiters[1].done(), "Echo request should not match a probe"
+            assert not waiters[2].done(), "Truncated packet should be ignored"
+            assert waiters[3].done() and waiters[3].result(), "Echo reply should match its probe"
+        finally:
+            daemon._icmp_waiters.clear()
+            sender.close()
+            receiver.close()
+            loop.close()
+        print("✓ ICMP replies are matched correctly")
+        
+        # Test address deduplication within and across endpoints
+        unique_ips = daemon._index_addresses([
+            {'name': 'one', 'addresses': ['a', 'a', 'b']},
+            {'name': 'two', 'addresses': ['b', 'c']},
+            {'name': 'three'}
+        ])
+        assert unique_ips == {'a': [0], 'b': [0, 1], 'c': [1]}, f"Unexpected index: {unique_ips}"
+        print("✓ Address deduplication works correctly")
+        
+        # Test early verdicts with a fake ping
+        calls = {}
+        daemon._ping = make_fake_ping({
+            'up': (0.01, True),
+            'resolved-up': (0.01, True),
+            'down': (0.05, False),
+            'down-2': (0.06, False),
+            'down-3': (0.07, False)
+        }, calls)
+        
+        async def fake_resolve(name):
+            return ['resolved-up'] if name == 'host' else []
+        daemon._resolve = fake_resolve
+        
+        endpoints = [{'addresses': ['up']}, {'addresses': ['down']}]
+        result = asyncio.run(daemon._test_endpoints(endpoints, daemon._index_addresses(endpoints)))
+        assert result == (1, 1), f"Expected 1 of 2 reachable after 1 test, got {result}"
+        
+        endpoints = [{'addresses': ['down']}, {'addresses': ['down-2']}, {'addresses': ['down-3']}]
+        result = asyncio.run(daemon._test_endpoints(endpoints, daemon._index_addresses(endpoints)))
+        assert result == (0, 2), f"Expected 0 of 3 reachable after 2 tests, got {result}"
+        print("✓ Connectivity verdict stops early once decided")
+        
+        # Test shared addresses, duplicates and name fallback with every
+        # endpoint required, so all of them are decided
+        calls.clear()
+        daemon.HEALTHY_FRACTION = 1.0
+        endpoints = [
+            {'addresses': ['down', 'up']},
+            {'addresses': ['down', 'down']},
+            {'name': 'host'},
+            {'addresses': ['up']}
+        ]
+        result = asyncio.run(daemon._test_endpoints(endpoints, daemon._index_addresses(endpoints)))
+        assert result == (3, 4), f"Expected 3 of 4 reachable after 4 tests, got {result}"
+        assert calls == {'up': 1, 'down': 1, 'resolved-up': 1}, f"Unexpected pings: {calls}"
+        print("✓ Shared addresses are pinged once and name fallback works")
+        
         print("✓ All basic tests passed!")
         
     except Exception as e:
@@ -99,7 +202,7 @@ def test_connectivity():
             'addresses': ['127.0.0.1']
         }
         
-        result = daemon._test_connectivity(localhost_endpoint)
+        result = asyncio.run(daemon._test_connectivity(localhost_endpoint))
         if result:
             print("✓ Localhost connectivity test passed")
         else: